@@ -6,7 +6,8 @@ This script acts as a virtual M8 device, receiving Launchpad Pro MIDI messages
 from Move's M8 emulator and responding with LED sysex like a real M8 would.
 
 Usage:
-    python virtual_m8.py [--list] [--input NAME] [--output NAME] [--passive]
+    python virtual_m8.py [--list] [--input NAME] [--output NAME] [--passive] [--sysex] [--rt]
+                         [--allow-clock] [--pure-mido]
 
 Requirements:
     pip install mido python-rtmidi
@@ -16,16 +17,36 @@ The script will:
 2. Wait for LPP identity response from Move's M8 emulator
 3. Send initial LED state once connected
 4. Receive button/pad presses and respond with LED updates
-5. Log all MIDI traffic for debugging
+5. Log connection state, and all MIDI traffic with --verbose
 
 Use --passive flag to skip the Device Inquiry and wait for the LPP to
 identify itself first (tests the fallback connection path).
+
+LED updates from MIDI that arrives together are coalesced (last color per
+note wins) and sent once. Use --sysex to send each batch as a single RGB
+sysex instead of one note message per LED.
+
+Use --rt to run the MIDI threads with real-time priority, reducing latency
+spikes when the machine is busy. On Linux SCHED_FIFO needs root or an
+rtprio limit (ulimit -r, /etc/security/limits.conf); alternatively start
+the script under chrt. Without it the script falls back to nice -10.
+
+MIDI clock and active sensing are dropped by rtmidi before they reach the
+script; use --allow-clock to let clock messages through.
+
+LED output goes straight to the rtmidi handle behind mido's output port,
+skipping mido's per-message object construction and validation;
+--pure-mido sends mido messages instead.
 """
 
 import argparse
+import atexit
+import os
+import queue
+import struct
 import sys
+import threading
 import time
-from datetime import datetime
 
 try:
     import mido
@@ -57,7 +78,7 @@ except ImportError:
 #   101 102 103 104 105 106 107 108
 
 # LPP Sysex header for LED control
-LPP_SYSEX_HEADER = [0x00, 0x20, 0x29, 0x02, 0x10]
+LPP_SYSEX_HEADER = bytes((0x00, 0x20, 0x29, 0x02, 0x10))
 
 # LED lighting modes
 LED_MODE_STATIC = 0x0A      # Static color
@@ -65,23 +86,65 @@ LED_MODE_FLASH = 0x23       # Flashing
 LED_MODE_PULSE = 0x28       # Pulsing
 LED_MODE_RGB = 0x0B         # RGB color (3 bytes per LED)
 
-# M8 color palette (approximate - real M8 colors may vary)
-M8_COLORS = {
-    'off': (0, 0, 0),
-    'white': (63, 63, 63),
-    'red': (63, 0, 0),
-    'green': (0, 63, 0),
-    'blue': (0, 0, 63),
-    'yellow': (63, 63, 0),
-    'cyan': (0, 63, 63),
-    'magenta': (63, 0, 63),
-    'orange': (63, 32, 0),
-    'pink': (63, 20, 40),
-    'dim_white': (20, 20, 20),
-    'dim_red': (20, 0, 0),
-    'dim_green': (0, 20, 0),
-    'dim_blue': (0, 0, 20),
-}
+# LED note messages go out as note on, MIDI channel 2 (mido channel 1), like the M8
+LED_NOTE_CHANNEL = 1
+LED_NOTE_STATUS = 0x90 | LED_NOTE_CHANNEL
+
+# Start of every RGB LED sysex frame: F0 00 20 29 02 10 0B
+LED_SYSEX_PREFIX = bytes((0xF0,)) + LPP_SYSEX_HEADER + bytes((LED_MODE_RGB,))
+
+# M8 color IDs - LED state is stored and passed around as these small ints,
+# RGB only comes into play when a message is encoded
+class C:
+    OFF = 0
+    WHITE = 1
+    RED = 2
+    GREEN = 3
+    BLUE = 4
+    YELLOW = 5
+    CYAN = 6
+    MAGENTA = 7
+    ORANGE = 8
+    PINK = 9
+    DIM_WHITE = 10
+    DIM_RED = 11
+    DIM_GREEN = 12
+    DIM_BLUE = 13
+
+
+# CIE 1931 correction for the LPP's 0-63 RGB levels: maps perceived lightness
+# to LED drive level, so palette entries below read as perceived brightness.
+# Built once here; encoding only ever indexes the finished palette.
+def _cie1931(level):
+    lightness = level * 100 / 63
+    if lightness <= 8:
+        luminance = lightness / 903.3
+    else:
+        luminance = ((lightness + 16) / 116) ** 3
+    return round(luminance * 63)
+
+
+_CIE_LUT = bytes(_cie1931(level) for level in range(64))
+
+# M8 color palette indexed by color ID, as perceived lightness (0-63); the
+# resulting drive levels match the original hand-picked ones, e.g. dim
+# lightness 40 drives at 20 (approximate - real M8 colors may vary)
+PALETTE = tuple(tuple(_CIE_LUT[c] for c in rgb) for rgb in (
+    (0, 0, 0),        # OFF
+    (63, 63, 63),     # WHITE
+    (63, 0, 0),       # RED
+    (0, 63, 0),       # GREEN
+    (0, 0, 63),       # BLUE
+    (63, 63, 0),      # YELLOW
+    (0, 63, 63),      # CYAN
+    (63, 0, 63),      # MAGENTA
+    (63, 48, 0),      # ORANGE
+    (63, 40, 53),     # PINK
+    (40, 40, 40),     # DIM_WHITE
+    (40, 0, 0),       # DIM_RED
+    (0, 40, 0),       # DIM_GREEN
+    (0, 0, 40),       # DIM_BLUE
+))
 
 # M8 Device Inquiry Request - sent by real M8 to discover Launchpad Pro
 # F0 7E 7F 06 01 F7 = Universal Non-Real Time Device Inquiry
@@ -107,6 +170,43 @@ M8_BUTTON_FUNCTIONS = {
     # Main grid (11-88) - Step sequencer / instruments
 }
 
+# LEDs driven by the virtual M8, in initial sync order
+GRID_NOTES = tuple(row * 10 + col for row in range(1, 9) for col in range(1, 9))
+TRACK_NOTES = tuple(range(91, 99))
+NAV_NOTES = (89, 79, 69, 59)    # Up, Right, Down, Left
+LED_NOTES = GRID_NOTES + TRACK_NOTES + NAV_NOTES
+
+# A full grid row / the track row in dim white, for slice assignment into led_state
+_ROW_DIM_WHITE = bytes((C.DIM_WHITE,)) * 8
+
+# Button kinds, looked up per incoming note instead of range/membership tests
+KIND_NONE = 0
+KIND_GRID = 1
+KIND_NAV = 2
+KIND_TRACK = 3
+KIND_SHIFT = 4
+
+_note_kind = bytearray(128)
+for _note in GRID_NOTES:
+    _note_kind[_note] = KIND_GRID
+for _note in NAV_NOTES:
+    _note_kind[_note] = KIND_NAV
+for _note in TRACK_NOTES:
+    _note_kind[_note] = KIND_TRACK
+_note_kind[106] = KIND_SHIFT
+NOTE_KIND = bytes(_note_kind)
+del _note_kind, _note
+
+# Incoming MIDI is handed from the rtmidi callback thread to the main loop
+# through a bounded queue; messages arriving while it is full are dropped.
+MIDI_QUEUE_SIZE = 256
+MIDI_QUEUE_TIMEOUT = 0.25   # Seconds - also bounds Ctrl+C / retry latency
+DROP_REPORT_INTERVAL = 1.0  # Seconds between "dropped messages" reports
+
+# Scheduling used by --rt
+RT_PRIORITY = 20            # SCHED_FIFO priority (1-99)
+RT_NICE = -10               # Fallback when SCHED_FIFO is not permitted
+
 
 # =============================================================================
 # Virtual M8 State
@@ -117,191 +217,279 @@ class VirtualM8:
 
     def __init__(self, verbose=False):
         self.verbose = verbose
-        self.led_state = {}  # note -> (r, g, b)
+        self.led_state = bytearray(128)  # note -> color ID
+        self._last_sent = bytearray(b'\xff' * 128)  # note -> color ID the LPP shows (0xFF = unknown)
         self.current_track = 0
         self.current_view = 'song'  # song, chain, phrase, instrument, etc.
         self.shift_held = False
+        self._pressed_from = {}  # held grid note -> color ID shown before the press
+
+        # LED changes since the last flush, note -> color ID (last write wins).
+        # Handlers write here in place rather than returning update lists.
+        self.pending = {}
 
         # Initialize default LED state (dim grid)
         self._init_leds()
 
+        # Boot LED state never changes, so encode its sysex once up front
+        boot_leds = [(note, self.led_state[note]) for note in sorted(LED_NOTES)]
+        buf = bytearray(LED_SYSEX_MAX)
+        self._initial_sysex_bytes = bytes(buf[:encode_led_sysex(boot_leds, buf)])
+
     def _init_leds(self):
         """Set up initial LED state like M8 boot screen"""
-        # Dim the main grid
-        for row in range(1, 9):
-            for col in range(1, 9):
-                note = row * 10 + col
-                self.led_state[note] = M8_COLORS['dim_white']
+        # Dim the main grid, one 8-pad row slice at a time
+        for row in range(10, 90, 10):
+            self.led_state[row + 1:row + 9] = _ROW_DIM_WHITE
 
         # Track buttons - first one lit
-        for i, note in enumerate(range(91, 99)):
-            if i == 0:
-                self.led_state[note] = M8_COLORS['cyan']
-            else:
-                self.led_state[note] = M8_COLORS['dim_white']
-
-        # Navigation buttons
-        self.led_state[89] = M8_COLORS['dim_blue']  # Up
-        self.led_state[79] = M8_COLORS['dim_blue']  # Right
-        self.led_state[69] = M8_COLORS['dim_blue']  # Down
-        self.led_state[59] = M8_COLORS['dim_blue']  # Left
+        self.led_state[91:99] = _ROW_DIM_WHITE
+        self.led_state[91] = C.CYAN
+
+        # Navigation buttons (59, 69, 79, 89)
+        self.led_state[59:90:10] = bytes((C.DIM_BLUE,)) * 4
+
+    def handle_note(self, note, velocity):
+        """Handle a note from the LPP emulator (velocity 0 is a release)"""
+        if velocity:
+            self.handle_note_on(note, velocity)
+        else:
+            self.handle_note_off(note, 0)
 
     def handle_note_on(self, note, velocity):
         """Handle a button press from the LPP emulator"""
-        log(f"Button ON:  note={note:3d} vel={velocity:3d}", 'rx')
+        log('rx', "Button ON:  note=%3d vel=%3d", note, velocity)
+
+        kind = NOTE_KIND[note]
+
+        # Main grid press - light it up, remembering what it showed before
+        if kind == KIND_GRID:
+            self._pressed_from.setdefault(note, self.led_state[note])
+            self._set_led(note, C.WHITE)
 
         # Track selection (top row)
-        if 91 <= note <= 98:
+        elif kind == KIND_TRACK:
             track = note - 91
             self._select_track(track)
-            return self._get_track_led_updates()
+            self._update_track_leds()
 
         # Navigation
-        if note in [89, 79, 69, 59]:
-            return self._handle_nav(note, True)
-
-        # Main grid press - light it up
-        if 11 <= note <= 88 and note % 10 != 0 and note % 10 != 9:
-            self.led_state[note] = M8_COLORS['white']
-            return [(note, M8_COLORS['white'])]
+        elif kind == KIND_NAV:
+            self._handle_nav(note, True)
 
         # Function buttons
-        if note == 106:  # Shift
+        elif kind == KIND_SHIFT:
             self.shift_held = True
-            return [(note, M8_COLORS['orange'])]
-
-        return []
+            self._set_led(note, C.ORANGE)
 
     def handle_note_off(self, note, velocity):
         """Handle a button release"""
-        log(f"Button OFF: note={note:3d}", 'rx')
+        log('rx', "Button OFF: note=%3d", note)
 
-        # Main grid release - return to dim
-        if 11 <= note <= 88 and note % 10 != 0 and note % 10 != 9:
-            self.led_state[note] = M8_COLORS['dim_white']
-            return [(note, M8_COLORS['dim_white'])]
+        kind = NOTE_KIND[note]
+
+        # Main grid release - restore the color from before the press
+        if kind == KIND_GRID:
+            self._set_led(note, self._pressed_from.pop(note, C.DIM_WHITE))
 
         # Navigation release
-        if note in [89, 79, 69, 59]:
-            return self._handle_nav(note, False)
+        elif kind == KIND_NAV:
+            self._handle_nav(note, False)
 
         # Shift release
-        if note == 106:
+        elif kind == KIND_SHIFT:
             self.shift_held = False
-            return [(note, M8_COLORS['dim_white'])]
+            self._set_led(note, C.DIM_WHITE)
 
-        return []
+    def _set_led(self, note, color):
+        """Change one LED and queue it for the next flush"""
+        self.led_state[note] = color
+        self.pending[note] = color
 
     def _select_track(self, track):
         """Select a track (0-7)"""
         self.current_track = track
-        log(f"Track selected: {track + 1}", 'state')
-
-    def _get_track_led_updates(self):
-        """Get LED updates for track selection"""
-        updates = []
-        for i in range(8):
-            note = 91 + i
-            if i == self.current_track:
-                color = M8_COLORS['cyan']
-            else:
-                color = M8_COLORS['dim_white']
-            self.led_state[note] = color
-            updates.append((note, color))
-        return updates
+        log('state', "Track selected: %d", track + 1)
+
+    def _update_track_leds(self):
+        """Light the selected track button and queue the track row"""
+        self.led_state[91:99] = _ROW_DIM_WHITE
+        self.led_state[91 + self.current_track] = C.CYAN
+        self.pending.update(zip(TRACK_NOTES, self.led_state[91:99]))
 
     def _handle_nav(self, note, pressed):
         """Handle navigation button"""
-        if pressed:
-            self.led_state[note] = M8_COLORS['blue']
-        else:
-            self.led_state[note] = M8_COLORS['dim_blue']
-        return [(note, self.led_state[note])]
+        self._set_led(note, C.BLUE if pressed else C.DIM_BLUE)
 
     def get_all_leds(self):
         """Get all LED states for initial sync"""
-        return list(self.led_state.items())
+        return [(note, self.led_state[note]) for note in LED_NOTES]
+
+    def forget_sent(self):
+        """Treat every LED as unknown, e.g. after the LPP has reset its LEDs"""
+        self._last_sent[:] = b'\xff' * 128
+
+    def mark_sent(self, updates):
+        """Record LED updates as shown on the LPP"""
+        last_sent = self._last_sent
+        for note, color in updates:
+            last_sent[note] = color
+
+    def unsent_updates(self, updates):
+        """Drop updates whose color the LPP already shows, and mark the rest as sent"""
+        last_sent = self._last_sent
+        changed = [(note, color) for note, color in updates if last_sent[note] != color]
+        self.mark_sent(changed)
+        return changed
+
+    def take_pending(self):
+        """Return the pending LED updates the LPP doesn't show yet, and clear them"""
+        changed = self.unsent_updates(self.pending.items())
+        self.pending.clear()
+        return changed
 
 
 # =============================================================================
 # MIDI Communication
 # =============================================================================
 
-def create_led_sysex(updates):
+# Largest RGB LED sysex frame: prefix, one entry per note, F7
+LED_SYSEX_MAX = len(LED_SYSEX_PREFIX) + 4 * 128 + 1
+
+# Reused by send_led_updates() so sending doesn't allocate a fresh buffer
+_sysex_buf = bytearray(LED_SYSEX_MAX)
+
+# One [note r g b] entry of an RGB LED sysex
+_LED_ENTRY = struct.Struct('4B')
+
+
+def encode_led_sysex(updates, out):
     """
-    Create LPP sysex message for LED updates (RGB mode).
+    Encode a complete RGB LED sysex frame into a preallocated buffer.
 
     Args:
-        updates: list of (note, (r, g, b)) tuples
+        updates: list of (note, color ID) tuples, at most one per note
+        out: bytearray of at least LED_SYSEX_MAX bytes
 
     Returns:
-        mido.Message sysex message
+        number of bytes written (F0 00 20 29 02 10 0B [note r g b]... F7)
     """
-    if not updates:
-        return None
+    k = len(LED_SYSEX_PREFIX)
+    out[:k] = LED_SYSEX_PREFIX
+
+    pack_into = _LED_ENTRY.pack_into
+    for note, color in updates:
+        pack_into(out, k, note, *PALETTE[color])
+        k += 4
+
+    out[k] = 0xF7
+    return k + 1
+
+
+def _rgb_to_velocity(r, g, b):
+    """Approximate an RGB color with an M8 note velocity (color index)"""
+    if max(r, g, b) == 0:
+        return 0
+
+    # Use color palette indices that the M8 emulator recognizes
+    if r > g and r > b:
+        return 0x05  # red
+    elif g > r and g > b:
+        return 0x15  # green
+    elif b > r and b > g:
+        return 0x27  # blue
+    elif r > 0 and g > 0 and b == 0:
+        return 0x17  # yellow/lime
+    elif r == 0 and g > 0 and b > 0:
+        return 0x13  # cyan/aqua
+    else:
+        return 0x01  # dim white
+
 
-    # Build RGB LED sysex: F0 00 20 29 02 10 0B [note r g b]... F7
-    data = LPP_SYSEX_HEADER + [LED_MODE_RGB]
+# Note velocity for each color ID
+_COLOR_VELOCITY = bytes(_rgb_to_velocity(*rgb) for rgb in PALETTE)
 
-    for note, (r, g, b) in updates:
-        data.extend([note, r, g, b])
 
-    return mido.Message('sysex', data=data)
+_LOG_PREFIX = {
+    'rx': '← RX',
+    'tx': '→ TX',
+    'info': '  ℹ️ ',
+    'state': '  📊',
+    'error': '  ❌',
+}
 
+# Categories that are printed; per-message 'rx'/'tx' traffic is added by --verbose
+_LOG_ENABLED = {'info', 'state', 'error'}
 
-def create_led_notes(updates):
-    """
-    Create note messages for LED updates (velocity = color index).
-    This is what the real M8 sends - note on messages with color as velocity.
 
-    Args:
-        updates: list of (note, (r, g, b)) tuples
+# [epoch second, "HH:MM:SS"] - the formatted time only changes once a second
+_log_second = [0, ""]
 
-    Returns:
-        list of mido.Message note_on messages
+
+def _write_log_line(t, category, fmt, args):
+    """Format one log entry as "[HH:MM:SS.mmm] prefix message" and write it"""
+    sec = int(t)
+    if sec != _log_second[0]:
+        _log_second[:] = [sec, time.strftime('%H:%M:%S', time.localtime(sec))]
+    ms = int((t - sec) * 1000)
+
+    msg = fmt % args if args else fmt
+    sys.stdout.write(f"[{_log_second[1]}.{ms:03d}] {_LOG_PREFIX.get(category, '    ')} {msg}\n")
+
+
+# While the main loop runs, (time, category, fmt, args) entries go through
+# this queue to a writer thread so a slow terminal never blocks MIDI handling
+_log_queue = queue.SimpleQueue()
+_log_thread = None
+
+
+def _log_worker():
+    """Write queued log entries until the None sentinel arrives"""
+    while True:
+        entry = _log_queue.get()
+        if entry is None:
+            break
+        _write_log_line(*entry)
+        if _log_queue.empty():
+            sys.stdout.flush()
+
+
+def start_log_thread():
+    """Write log output from a background thread until stop_log_thread()"""
+    global _log_thread
+    if _log_thread is None:
+        _log_thread = threading.Thread(target=_log_worker, name='log', daemon=True)
+        _log_thread.start()
+
+
+def stop_log_thread():
+    """Flush queued log output and go back to writing synchronously"""
+    global _log_thread
+    if _log_thread is not None:
+        _log_queue.put(None)
+        _log_thread.join()
+        _log_thread = None
+
+
+# Never lose queued lines, whatever path the script exits through
+atexit.register(stop_log_thread)
+
+
+def log(category, fmt, *args):
     """
-    if not updates:
-        return []
-
-    messages = []
-    for note, (r, g, b) in updates:
-        # Convert RGB to a simple velocity/color value
-        # M8 uses specific color indices - approximate with brightness
-        velocity = max(r, g, b)
-        if velocity == 0:
-            velocity = 0
-        else:
-            # Use color palette indices that the M8 emulator recognizes
-            if r > g and r > b:
-                velocity = 0x05  # red
-            elif g > r and g > b:
-                velocity = 0x15  # green
-            elif b > r and b > g:
-                velocity = 0x27  # blue
-            elif r > 0 and g > 0 and b == 0:
-                velocity = 0x17  # yellow/lime
-            elif r == 0 and g > 0 and b > 0:
-                velocity = 0x13  # cyan/aqua
-            else:
-                velocity = 0x01  # dim white
-
-        # Send on channel 1 (0x90) or channel 2 (0x91) based on M8 protocol
-        messages.append(mido.Message('note_on', note=note, velocity=velocity, channel=1))
-
-    return messages
-
-
-def log(msg, category='info'):
-    """Log with timestamp and category"""
-    timestamp = datetime.now().strftime('%H:%M:%S.%f')[:-3]
-    prefix = {
-        'rx': '← RX',
-        'tx': '→ TX',
-        'info': '  ℹ️ ',
-        'state': '  📊',
-        'error': '  ❌',
-    }.get(category, '    ')
-    print(f"[{timestamp}] {prefix} {msg}")
+    Log with timestamp and category.
+
+    Disabled categories return before any formatting, so log calls on the
+    MIDI path cost next to nothing unless --verbose is on. Enabled ones are
+    formatted and written by the log thread when it is running.
+    """
+    if category not in _LOG_ENABLED:
+        return
+
+    if _log_thread is not None:
+        _log_queue.put_nowait((time.time(), category, fmt, args))
+    else:
+        _write_log_line(time.time(), category, fmt, args)
 
 
 def list_ports():
@@ -333,91 +521,245 @@ def find_move_ports():
     return input_port, output_port
 
 
-def run_virtual_m8(input_port, output_port, verbose=False, use_real_handshake=True):
+class RawMidiOut:
+    """
+    Wraps a mido output port with a raw-bytes send_message().
+
+    With mido's rtmidi backend, send_message() hands the bytes straight to
+    the port's rtmidi.MidiOut, so the LED path never builds or validates
+    mido.Message objects. Other backends (or pure_mido) parse the bytes
+    into a mido.Message and send that.
+    """
+
+    def __init__(self, port, pure_mido=False):
+        self.port = port
+        # mido exposes no raw send; _rt is the rtmidi backend's MidiOut
+        rt_out = None if pure_mido else getattr(port, '_rt', None)
+        if rt_out is not None:
+            self.send_message = rt_out.send_message
+
+    def send_message(self, data):
+        """Send one complete MIDI message given as bytes"""
+        self.port.send(mido.Message.from_bytes(bytes(data)))
+
+    def send(self, msg):
+        """Send a mido.Message"""
+        self.port.send(msg)
+
+    def close(self):
+        self.port.close()
+
+
+def send_led_updates(outport, updates, use_sysex=False):
+    """
+    Send LED updates to the LPP emulator through a RawMidiOut.
+
+    By default each LED goes out as a note message like the real M8; with
+    use_sysex the whole batch is packed into a single RGB sysex.
+
+    Returns:
+        number of MIDI messages sent
+    """
+    if not updates:
+        return 0
+
+    if use_sysex:
+        n = encode_led_sysex(updates, _sysex_buf)
+        outport.send_message(memoryview(_sysex_buf)[:n])
+        return 1
+
+    send_message = outport.send_message
+    for note, color in updates:
+        send_message((LED_NOTE_STATUS, note, _COLOR_VELOCITY[color]))
+    return len(updates)
+
+
+def raise_thread_priority():
+    """
+    Give the calling thread higher priority.
+
+    On Linux, threads started afterwards (such as rtmidi's callback thread)
+    inherit the new scheduling. On Windows, SetThreadPriority only affects
+    the calling thread; new threads and WinMM callback threads keep normal
+    priority.
+
+    Returns:
+        description of the priority applied, or None if none could be set
+    """
+    if sys.platform == 'win32':
+        import ctypes
+        THREAD_PRIORITY_TIME_CRITICAL = 15
+        kernel32 = ctypes.windll.kernel32
+        if kernel32.SetThreadPriority(kernel32.GetCurrentThread(), THREAD_PRIORITY_TIME_CRITICAL):
+            return "THREAD_PRIORITY_TIME_CRITICAL"
+        return None
+
+    if hasattr(os, 'sched_setscheduler'):
+        try:
+            os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(RT_PRIORITY))
+            return f"SCHED_FIFO priority {RT_PRIORITY}"
+        except OSError:
+            pass
+
+    try:
+        os.nice(RT_NICE)
+        return f"nice {RT_NICE}"
+    except OSError:
+        return None
+
+
+def run_virtual_m8(input_port, output_port, verbose=False, use_real_handshake=True,
+                   use_sysex=False, realtime=False, allow_clock=False, pure_mido=False):
     """Main loop - receive MIDI, simulate M8, send responses"""
 
+    if verbose:
+        _LOG_ENABLED.update(('rx', 'tx'))
+
     m8 = VirtualM8(verbose=verbose)
     connected = False  # Track if we've connected to LPP
+    leds_changed = False  # LED state has moved on from boot (cached sysex is stale)
     inquiry_sent = False
     inquiry_retry_time = 0
     INQUIRY_RETRY_INTERVAL = 2.0  # Retry every 2 seconds
 
-    log(f"Opening input:  {input_port}")
-    log(f"Opening output: {output_port}")
+    midi_queue = queue.Queue(maxsize=MIDI_QUEUE_SIZE)
+    dropped = 0             # Incremented on the callback thread only
+    dropped_reported = 0
+    drop_report_time = 0
+
+    def on_message(msg):
+        # Runs on rtmidi's thread - keep it to a bare enqueue
+        nonlocal dropped
+        try:
+            midi_queue.put_nowait(msg)
+        except queue.Full:
+            dropped += 1
+
+    # Started before --rt raises priority, so the log thread keeps normal
+    # scheduling instead of competing with MIDI handling
+    start_log_thread()
+
+    if realtime:
+        # Before opening ports, so on Linux rtmidi's callback thread inherits it
+        applied = raise_thread_priority()
+        if applied:
+            log('info', "Real-time priority: %s", applied)
+        else:
+            log('error', "Could not raise priority (raise the rtprio limit: ulimit -r / limits.conf)")
+
+    log('info', "Opening input:  %s", input_port)
+    log('info', "Opening output: %s", output_port)
 
     try:
-        inport = mido.open_input(input_port)
-        outport = mido.open_output(output_port)
+        inport = mido.open_input(input_port, callback=on_message)
+        outport = RawMidiOut(mido.open_output(output_port), pure_mido)
     except Exception as e:
-        log(f"Failed to open MIDI ports: {e}", 'error')
+        log('error', "Failed to open MIDI ports: %s", e)
+        stop_log_thread()
         return
 
-    log("Virtual M8 running! Press Ctrl+C to exit.")
-
-    if use_real_handshake:
-        log("Using REAL M8 handshake (Device Inquiry Request)")
-        log("Sending Device Inquiry Request: F0 7E 7F 06 01 F7")
-        # Send Device Inquiry Request like a real M8 does
-        outport.send(mido.Message('sysex', data=M8_DEVICE_INQUIRY))
-        inquiry_sent = True
-        inquiry_retry_time = time.time()
-        log("Waiting for LPP identity response...")
-    else:
-        log("Using PASSIVE mode (waiting for LPP to identify itself)")
-
     try:
+        # Filter real-time traffic in rtmidi so it never wakes the callback.
+        # mido exposes no API for this; _rt is the rtmidi backend's MidiIn.
+        rt_in = getattr(inport, '_rt', None)
+        if rt_in is not None:
+            rt_in.ignore_types(False, not allow_clock, True)  # sysex, timing, active sensing
+
+        log('info', "Virtual M8 running! Press Ctrl+C to exit.")
+
+        if use_real_handshake:
+            log('info', "Using REAL M8 handshake (Device Inquiry Request)")
+            log('info', "Sending Device Inquiry Request: F0 7E 7F 06 01 F7")
+            # Send Device Inquiry Request like a real M8 does
+            outport.send(mido.Message('sysex', data=M8_DEVICE_INQUIRY))
+            inquiry_sent = True
+            inquiry_retry_time = time.time()
+            log('info', "Waiting for LPP identity response...")
+        else:
+            log('info', "Using PASSIVE mode (waiting for LPP to identify itself)")
+
         while True:
+            # Report messages the callback had to drop since the last report
+            if dropped != dropped_reported and time.time() - drop_report_time >= DROP_REPORT_INTERVAL:
+                total = dropped
+                log('error', "Dropped %d MIDI messages (queue full)", total - dropped_reported)
+                dropped_reported = total
+                drop_report_time = time.time()
+
             # Retry Device Inquiry if no response yet (real handshake mode)
             if use_real_handshake and not connected and inquiry_sent:
                 if time.time() - inquiry_retry_time > INQUIRY_RETRY_INTERVAL:
-                    log("No response yet, retrying Device Inquiry Request...")
+                    log('info', "No response yet, retrying Device Inquiry Request...")
                     outport.send(mido.Message('sysex', data=M8_DEVICE_INQUIRY))
                     inquiry_retry_time = time.time()
 
-            # Process incoming MIDI
-            for msg in inport.iter_pending():
-                updates = []
-
-                if msg.type == 'note_on' and msg.velocity > 0:
-                    updates = m8.handle_note_on(msg.note, msg.velocity)
-                elif msg.type == 'note_off' or (msg.type == 'note_on' and msg.velocity == 0):
-                    updates = m8.handle_note_off(msg.note, 0)
-                elif msg.type == 'control_change':
-                    log(f"CC: cc={msg.control} val={msg.value}", 'rx')
-                elif msg.type == 'sysex':
-                    log(f"Sysex received: {len(msg.data)} bytes", 'rx')
+            # Block until MIDI arrives (timeout keeps retries and Ctrl+C responsive)
+            try:
+                msgs = [midi_queue.get(timeout=MIDI_QUEUE_TIMEOUT)]
+            except queue.Empty:
+                continue
+
+            # Drain whatever else is already queued so it is handled as one batch
+            while True:
+                try:
+                    msgs.append(midi_queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            # Handlers queue LED changes in m8.pending for one flush per batch
+            for msg in msgs:
+                msg_type = msg.type
+
+                if msg_type == 'note_on':
+                    m8.handle_note(msg.note, msg.velocity)
+                elif msg_type == 'note_off':
+                    m8.handle_note_off(msg.note, 0)
+                elif msg_type == 'control_change':
+                    log('rx', "CC: cc=%d val=%d", msg.control, msg.value)
+                elif msg_type == 'sysex':
+                    log('rx', "Sysex received: %d bytes", len(msg.data))
                     if verbose:
-                        log(f"  Data: {' '.join(f'{b:02X}' for b in msg.data[:20])}...", 'rx')
+                        log('rx', "  Data: %s...", ' '.join(f'{b:02X}' for b in msg.data[:20]))
 
                     # Check for LPP identity response: 7E 00 06 02 00 20 29 (Novation)
                     # This is what the M8 emulator sends in response to our Device Inquiry
                     if len(msg.data) >= 7 and msg.data[0:4] == LPP_IDENTITY_PATTERN:
-                        log("LPP identity response detected! Connection established.", 'info')
                         if not connected:
+                            log('info', "LPP identity response detected! Connection established.")
                             connected = True
-                            # Send initial LED state as note messages (like real M8)
-                            log("Sending initial LED state...", 'tx')
-                            initial_leds = m8.get_all_leds()
-                            notes = create_led_notes(initial_leds)
-                            for note_msg in notes:
-                                outport.send(note_msg)
-                            log(f"Sent {len(notes)} LED note messages", 'tx')
-
-                # Send LED updates as note messages
-                if updates:
-                    notes = create_led_notes(updates)
-                    for note_msg in notes:
-                        outport.send(note_msg)
-                    if notes:
-                        log(f"LED update: {len(notes)} notes", 'tx')
-
-            time.sleep(0.001)  # Small sleep to prevent CPU spin
+                        else:
+                            log('info', "LPP identified again, resending all LEDs.")
+
+                        # A (re)identifying LPP starts with its LEDs reset, so
+                        # nothing previously sent can be assumed to be shown
+                        m8.forget_sent()
+                        log('tx', "Sending initial LED state...")
+                        initial_leds = m8.get_all_leds()
+                        if use_sysex and not (leds_changed or m8.pending):
+                            outport.send_message(m8._initial_sysex_bytes)
+                            count = 1
+                        else:
+                            count = send_led_updates(outport, initial_leds, use_sysex)
+                        m8.mark_sent(initial_leds)
+                        log('tx', "Sent %d LED messages", count)
+
+            if m8.pending:
+                leds_changed = True
+
+            # Send the coalesced LED updates, skipping colors the LPP already shows
+            changed = m8.take_pending()
+            if changed:
+                count = send_led_updates(outport, changed, use_sysex)
+                log('tx', "LED update: %d LEDs in %d messages", len(changed), count)
 
     except KeyboardInterrupt:
-        log("\nShutting down...")
+        log('info', "\nShutting down...")
+        if dropped:
+            log('error', "Dropped %d MIDI messages in total (queue full)", dropped)
     finally:
         inport.close()
         outport.close()
+        stop_log_thread()
 
 
 # =============================================================================
@@ -447,6 +789,14 @@ Examples:
                         help='Verbose output (show all MIDI data)')
     parser.add_argument('--passive', '-p', action='store_true',
                         help='Passive mode: wait for LPP identity instead of sending Device Inquiry')
+    parser.add_argument('--sysex', '-s', action='store_true',
+                        help='Send LED updates as one RGB sysex per batch instead of note messages')
+    parser.add_argument('--rt', action='store_true',
+                        help='Run MIDI handling with real-time priority (needs an rtprio limit, see ulimit -r)')
+    parser.add_argument('--allow-clock', action='store_true',
+                        help='Receive MIDI clock messages (filtered out by default)')
+    parser.add_argument('--pure-mido', action='store_true',
+                        help='Send mido messages instead of raw bytes through the rtmidi port')
 
     args = parser.parse_args()
 
@@ -464,12 +814,15 @@ Examples:
         output_port = output_port or auto_out
 
     if not input_port or not output_port:
-        log("Could not find Move MIDI ports. Use --list to see available ports.", 'error')
-        log("Then specify with: --input 'port name' --output 'port name'", 'error')
+        log('error', "Could not find Move MIDI ports. Use --list to see available ports.")
+        log('error', "Then specify with: --input 'port name' --output 'port name'")
         list_ports()
         return
 
-    run_virtual_m8(input_port, output_port, verbose=args.verbose, use_real_handshake=not args.passive)
+    run_virtual_m8(input_port, output_port, verbose=args.verbose,
+                   use_real_handshake=not args.passive, use_sysex=args.sysex,
+                   realtime=args.rt, allow_clock=args.allow_clock,
+                   pure_mido=args.pure_mido)
 
 
 if __name__ == '__main__':